@@ -1 +1,2 @@
 from .geometamaker import MetadataControl
+from .geometamaker import describe_many
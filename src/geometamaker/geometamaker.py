@@ -1,22 +1,37 @@
+import concurrent.futures
+import copy
+import functools
+import json
 import logging
 import os
+import re
+import sys
+import tempfile
 import uuid
+from datetime import date
 from datetime import datetime
 
+import fastjsonschema
 import jsonschema
 from jsonschema.exceptions import ValidationError
 import pygeometa.core
-from pygeometa.schemas.iso19139 import ISO19139OutputSchema
-from pygeometa.schemas.iso19139_2 import ISO19139_2OutputSchema
-import pygeoprocessing
 from osgeo import gdal
 from osgeo import ogr
 from osgeo import osr
 import yaml
 
 
+# Use the libyaml C loader and emitter when pyyaml was built with them
+try:
+    _SafeLoader = yaml.CSafeLoader
+    _SafeDumper = yaml.CSafeDumper
+except AttributeError:
+    _SafeLoader = yaml.SafeLoader
+    _SafeDumper = yaml.SafeDumper
+
+
 # https://stackoverflow.com/questions/13518819/avoid-references-in-pyyaml
-class _NoAliasDumper(yaml.SafeDumper):
+class _NoAliasDumper(_SafeDumper):
     """Keep the yaml human-readable by avoiding anchors and aliases."""
 
     def ignore_aliases(self, data):
@@ -25,21 +40,65 @@ class _NoAliasDumper(yaml.SafeDumper):
 
 LOGGER = logging.getLogger(__name__)
 
+_WRITE_BUFFER_SIZE = 1 << 16  # bytes
+
 MCF_SCHEMA_FILE = os.path.join(
     pygeometa.core.SCHEMAS, 'mcf', 'core.yaml')
-with open(MCF_SCHEMA_FILE, 'r') as schema_file:
-    MCF_SCHEMA = pygeometa.core.yaml_load(schema_file)
-
-# modify the core MCF schema so that our default
-# template MCFs have all the properties we expect
-# users to use.
-MCF_SCHEMA['required'].append('content_info')
-MCF_SCHEMA['properties']['content_info']['required'].append(
-    'attributes')
-MCF_SCHEMA['required'].append('dataquality')
-MCF_SCHEMA['properties']['identification']['properties'][
-    'keywords']['patternProperties']['^.*'][
-    'required'] = ['keywords', 'keywords_type']
+
+
+def _load_mcf_schema():
+    """Load the MCF schema and modify it for geometamaker.
+
+    Returns:
+        dict of the core MCF schema, modified for geometamaker
+
+    """
+    # The schema does not use the environment variable substitution
+    # that pygeometa.core.yaml_load supports, so it can use a faster loader.
+    with open(MCF_SCHEMA_FILE, 'r') as schema_file:
+        schema = yaml.load(schema_file, Loader=_SafeLoader)
+
+    # modify the core MCF schema so that our default
+    # template MCFs have all the properties we expect
+    # users to use.
+    schema['required'].append('content_info')
+    schema['properties']['content_info']['required'].append(
+        'attributes')
+    schema['required'].append('dataquality')
+    schema['properties']['identification']['properties'][
+        'keywords']['patternProperties']['^.*'][
+        'required'] = ['keywords', 'keywords_type']
+
+    # Check the schema once, rather than every time an MCF is validated.
+    jsonschema.validators.validator_for(schema).check_schema(schema)
+    return schema
+
+
+def _get_mcf_schema():
+    """Get the MCF schema, loading it the first time it is needed.
+
+    Returns:
+        dict of the core MCF schema, modified for geometamaker
+
+    """
+    return _get_mcf_schema_and_template()[0]
+
+
+@functools.lru_cache(maxsize=None)
+def _get_mcf_validator():
+    """Compile a function that validates an MCF against the schema."""
+    # fastjsonschema rewrites $refs in the schema it is given, so give it a copy.
+    # Like jsonschema.validate, do not enforce 'format' or fill in defaults.
+    return fastjsonschema.compile(
+        copy.deepcopy(_get_mcf_schema()), use_default=False, use_formats=False)
+
+
+def __getattr__(name):
+    # MCF_SCHEMA is loaded lazily, but is still available as a module attribute
+    if name == 'MCF_SCHEMA':
+        return _get_mcf_schema()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
 
 OGR_MCF_ATTR_TYPE_MAP = {
     ogr.OFTInteger: 'integer',
@@ -48,6 +107,56 @@ OGR_MCF_ATTR_TYPE_MAP = {
     ogr.OFTString: 'string'
 }
 
+# Properties of a band or field that need user input. Each attribute
+# starts as a copy of this dict.
+_ATTR_PROTO = {
+    'units': '',
+    'title': '',
+    'abstract': '',
+}
+
+# Substrings of OGR geometry type names and their MCF geometry types.
+# https://www.fgdc.gov/nap/metadata/register/codelists.html
+# The first match is used, so more specific names come first.
+_OGR_MCF_GEOM_TYPES = (
+    ('Collection', 'complex'),
+    ('Line', 'curve'),
+    ('Polygon', 'surface'),
+    ('Point', 'point'),
+)
+
+# GDAL data types not listed here (floating point and complex) are 'number'
+GDAL_MCF_ATTR_TYPE_MAP = {
+    gdal.GDT_Unknown: 'integer',
+    gdal.GDT_Byte: 'integer',
+    gdal.GDT_UInt16: 'integer',
+    gdal.GDT_Int16: 'integer',
+    gdal.GDT_UInt32: 'integer',
+    gdal.GDT_Int32: 'integer',
+}
+# integer types added in more recent versions of GDAL
+for _gdal_type in ('GDT_Int8', 'GDT_UInt64', 'GDT_Int64'):
+    if hasattr(gdal, _gdal_type):
+        GDAL_MCF_ATTR_TYPE_MAP[getattr(gdal, _gdal_type)] = 'integer'
+
+# TODO: read types from the #/definitions found in MCF_SCHEMA
+# instead of hardcoding values here
+# TODO: support i18n properly by using objects
+# keyed by country codes to contain the array of strings
+# Each type maps to a factory so that every property gets its own
+# default value, rather than sharing a mutable one like a list.
+DEFAULT_VALUES = {
+    'string': str,
+    'int': int,
+    'integer': int,
+    'number': float,
+    'boolean': bool,
+    '#/definitions/date_or_datetime_string': str,
+    '#/definitions/i18n_string': str,
+    '#/definitions/i18n_array': list,
+    '#/definitions/any_type': str,
+}
+
 
 def _get_default(item):
     """Return a default value for a property.
@@ -56,50 +165,31 @@ def _get_default(item):
         item (dict): a jsonschema definition of a property with no children.
 
     Return:
-        a value from DEFAULT_VALUES
+        a value created by a factory from DEFAULT_VALUES
 
     Raises:
         KeyError if ``item`` does not include an
-        'enum', 'type', or '$ref' property.
+        'enum', 'type', or '$ref' property, or if
+        DEFAULT_VALUES has no default for its type.
 
     """
-    # TODO: read types from the #/definitions found in MCF_SCHEMA
-    # instead of hardcoding values here
-    # TODO: support i18n properly by using objects
-    # keyed by country codes to contain the array of strings
-    default_values = {
-        'string': str(),
-        'int': int(),
-        'integer': int(),
-        'number': float(),
-        'boolean': False,
-        '#/definitions/date_or_datetime_string': str(),
-        '#/definitions/i18n_string': str(),
-        '#/definitions/i18n_array': list(),
-        '#/definitions/any_type': str(),
-    }
-
     # If there are enumerated values which must be used
-    try:
-        fixed_values = item['enum']
+    if 'enum' in item:
         # TODO: find a better way to choose the default
-        return fixed_values[0]
-    except KeyError:
-        pass
+        return item['enum'][0]
 
-    # If no enumerated values, get a default value based on type
-    try:
-        t = item['type']
-    except KeyError:
-        # When 'type' is missing, a $ref to another schema is present
-        try:
-            t = item['$ref']
-        except KeyError:
-            raise KeyError(
-                f'schema has no type and no reference to a type definition\n'
-                f'{item}')
+    # If no enumerated values, get a default value based on type.
+    # When 'type' is missing, a $ref to another schema is present
+    t = item.get('type') or item.get('$ref')
+    if t is None:
+        raise KeyError(
+            f'schema has no type and no reference to a type definition\n'
+            f'{item}')
 
-    return default_values[t]
+    factory = DEFAULT_VALUES.get(t)
+    if factory is None:
+        raise KeyError(f'no default value for type {t}')
+    return factory()
 
 
 def _get_template(schema):
@@ -118,47 +208,473 @@ def _get_template(schema):
         does not include an 'enum', 'type', or '$ref' property.
 
     """
-    template = {}
-    if 'type' in schema and schema['type'] == 'object':
-        for prop, sch in schema['properties'].items():
-            if 'required' in schema and prop not in schema['required']:
-                continue
-            if 'patternProperties' in sch:
-                # this item's properties can have any name matching the pattern.
-                # assign the name 'default' and overwite the current schema
-                # with a new one that explicitly includes the 'default' property.
-                example_sch = {
-                    'type': 'object',
-                    'required': ['default'],
-                    'properties': {
-                        'default': sch['patternProperties']['^.*']
+    # Walk the schema with a stack of (container, key, schema) items
+    # instead of recursing. Each item is a schema node whose template
+    # value belongs at ``container[key]``.
+    root = [None]
+    stack = [(root, 0, schema)]
+    while stack:
+        container, key, schema = stack.pop()
+        schema_type = schema.get('type')
+        if schema_type == 'object':
+            template = {}
+            required = set(schema['required']) if 'required' in schema else None
+            for prop, sch in schema['properties'].items():
+                if required is not None and prop not in required:
+                    continue
+                if 'patternProperties' in sch:
+                    # this item's properties can have any name matching the pattern.
+                    # assign the name 'default' and overwite the current schema
+                    # with a new one that explicitly includes the 'default' property.
+                    example_sch = {
+                        'type': 'object',
+                        'required': ['default'],
+                        'properties': {
+                            'default': sch['patternProperties']['^.*']
+                        }
                     }
-                }
-                sch = example_sch
-
-            if 'properties' in sch and 'anyOf' in sch['properties']:
-                # if 'anyOf' is a property, then we effectively want to
-                # treat the children of 'anyOf' as the properties instead.
-                template[prop] = {
-                    p: _get_template(s)
-                    for p, s in sch['properties']['anyOf'].items()
-                }
+                    sch = example_sch
+
+                sch_properties = sch.get('properties')
+                if sch_properties is not None and 'anyOf' in sch_properties:
+                    # if 'anyOf' is a property, then we effectively want to
+                    # treat the children of 'anyOf' as the properties instead.
+                    any_of = {}
+                    for p, s in sch_properties['anyOf'].items():
+                        # insert a placeholder to keep the properties in order
+                        any_of[p] = None
+                        stack.append((any_of, p, s))
+                    template[prop] = any_of
+                else:
+                    template[prop] = None
+                    stack.append((template, prop, sch))
+            container[key] = template
+
+        elif schema_type == 'array':
+            if 'properties' in schema:
+                # for the weird case where identification.extents.spatial
+                # is type: array but contains 'properties' instead of 'items'
+                item = {}
+                required = set(schema['required'])
+                for p, s in schema['properties'].items():
+                    if p in required:
+                        item[p] = None
+                        stack.append((item, p, s))
+                container[key] = [item]
+            else:
+                template = [None]
+                stack.append((template, 0, schema['items']))
+                container[key] = template
+        else:
+            container[key] = _get_default(schema)
+
+    return root[0]
+
+
+# GIS types of datasets. These are bit flags, since a dataset may
+# be both, and have the same values as pygeoprocessing's.
+_RASTER_TYPE = 1
+_VECTOR_TYPE = 2
+
+# File extensions that identify a GIS type without reading the file.
+# Extensions shared by more than one kind of dataset, like '.gpkg' (rasters
+# and/or vectors), '.vrt' (GDAL and OGR virtual formats) and '.csv'
+# (which GDAL opens as a vector), are left for GDAL to detect.
+_EXTENSION_GIS_TYPES = {
+    '.tif': _RASTER_TYPE,
+    '.tiff': _RASTER_TYPE,
+    '.img': _RASTER_TYPE,
+    '.shp': _VECTOR_TYPE,
+    '.geojson': _VECTOR_TYPE,
+    '.gml': _VECTOR_TYPE,
+    '.kml': _VECTOR_TYPE,
+}
+
+# File signatures that identify a GIS type without asking GDAL.
+# Formats like GeoPackage, which may hold rasters and/or vectors,
+# are left for GDAL to detect.
+_MAGIC_GIS_TYPES = {
+    b'II*\x00': _RASTER_TYPE,  # little-endian TIFF
+    b'MM\x00*': _RASTER_TYPE,  # big-endian TIFF
+    b'II+\x00': _RASTER_TYPE,  # little-endian BigTIFF
+    b'MM\x00+': _RASTER_TYPE,  # big-endian BigTIFF
+    b'\x00\x00\x27\x0a': _VECTOR_TYPE,  # ESRI Shapefile
+}
+
+
+def _sniff_gis_type(path):
+    """Identify a GIS type from the first bytes of a file.
+
+    Args:
+        path (string): path to a dataset
+
+    Returns:
+        ``_RASTER_TYPE`` or ``_VECTOR_TYPE``, or ``None`` if the
+        file signature is not recognized.
+
+    """
+    try:
+        with open(path, 'rb') as file:
+            magic = file.read(4)
+    except OSError:
+        return None
+    return _MAGIC_GIS_TYPES.get(magic)
+
+
+@functools.lru_cache(maxsize=4096)
+def _get_gis_type_cached(path, mtime, size):
+    """Detect the GIS type of a file, like ``pygeoprocessing.get_gis_type``.
+
+    ``mtime`` and ``size`` are part of the cache key so that a file
+    which changes on disk is detected again.
+
+    Returns:
+        ``_RASTER_TYPE`` and/or ``_VECTOR_TYPE``, or ``None`` if GDAL
+        cannot open the file.
+
+    """
+    gis_type = _sniff_gis_type(path)
+    if gis_type is not None:
+        return gis_type
+    # open once for both rasters and vectors, rather than once
+    # for each as pygeoprocessing.get_gis_type does.
+    dataset = gdal.OpenEx(path, gdal.OF_RASTER | gdal.OF_VECTOR)
+    if dataset is None:
+        return None
+    gis_type = 0
+    if dataset.RasterCount:
+        gis_type |= _RASTER_TYPE
+    if dataset.GetLayerCount():
+        gis_type |= _VECTOR_TYPE
+    dataset = None
+    return gis_type or None
+
+
+def _get_gis_type(path):
+    """Detect the GIS type of a file, reusing results for unchanged files.
+
+    Args:
+        path (string): path to a dataset
+
+    Returns:
+        ``_RASTER_TYPE`` and/or ``_VECTOR_TYPE``, or ``None`` if GDAL
+        cannot open the file.
+
+    """
+    gis_type = _EXTENSION_GIS_TYPES.get(os.path.splitext(path)[1].lower())
+    if gis_type is not None:
+        return gis_type
+    try:
+        stat = os.stat(path)
+    except OSError:
+        # not a local file, e.g. a path on a GDAL virtual filesystem
+        return _get_gis_type_cached.__wrapped__(path, None, None)
+    return _get_gis_type_cached(path, stat.st_mtime_ns, stat.st_size)
+
+
+def _get_field_attribute(field):
+    """Create an MCF attribute for a vector field.
+
+    Args:
+        field (ogr.FieldDefn): the field definition
+
+    Returns:
+        dict of the attribute's properties
+
+    """
+    attribute = _ATTR_PROTO.copy()
+    attribute['name'] = field.name
+    try:
+        attribute['type'] = OGR_MCF_ATTR_TYPE_MAP[field.type]
+    except KeyError:
+        LOGGER.warning(
+            f'{field.type} is missing in the OGR-to-MCF '
+            f'attribute type map; attribute type for field '
+            f'{field.name} will be "object".')
+    return attribute
+
+
+@functools.lru_cache(maxsize=256)
+def _wkt_to_epsg(wkt):
+    """Get the EPSG code of a spatial reference.
+
+    Datasets described together often share a spatial reference,
+    so results are cached to avoid parsing the same WKT repeatedly.
+
+    Args:
+        wkt (string): well-known text of a spatial reference
+
+    Returns:
+        string EPSG code, or ``None`` if there is no authority code.
+
+    """
+    srs = osr.SpatialReference()
+    srs.ImportFromWkt(wkt)
+    return srs.GetAttrValue('AUTHORITY', 1)
+
+
+def _get_cache_path():
+    """Get the path to the file caching the MCF schema and template."""
+    cache_dir = os.environ.get(
+        'XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(cache_dir, 'geometamaker', 'mcf_schema.json')
+
+
+@functools.lru_cache(maxsize=None)
+def _get_mcf_schema_and_template():
+    """Load the MCF schema and build a template MCF from it.
+
+    Parsing the schema's YAML and walking it to build the template is slow
+    relative to reading JSON, so the results are cached in a JSON file.
+    The cache is rebuilt when the pygeometa schema file or this module
+    is modified. Errors reading or writing the cache are not fatal.
+
+    The schema does not change after it is loaded, so neither does the
+    template. Each MetadataControl gets its own copy of the template.
+
+    Returns:
+        tuple of the modified MCF schema (dict) and a template MCF (dict)
+
+    """
+    cache_path = _get_cache_path()
+    cache_key = [
+        MCF_SCHEMA_FILE, os.stat(MCF_SCHEMA_FILE).st_mtime_ns,
+        __file__, os.stat(__file__).st_mtime_ns]
+    try:
+        with open(cache_path, 'r') as cache_file:
+            cache = json.load(cache_file)
+        if cache['key'] == cache_key:
+            return cache['schema'], _intern_keys(cache['template'])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    schema = _load_mcf_schema()
+    template = _get_template(schema)
+    temp_path = None
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        # write to a temporary file and then move it into place so that
+        # other processes never read a partially written cache
+        with tempfile.NamedTemporaryFile(
+                'w', dir=os.path.dirname(cache_path),
+                suffix='.json', delete=False) as cache_file:
+            temp_path = cache_file.name
+            json.dump({
+                'key': cache_key,
+                'schema': schema,
+                'template': template
+            }, cache_file)
+        os.replace(temp_path, cache_path)
+    except (OSError, TypeError, ValueError) as err:
+        LOGGER.debug(f'could not cache the MCF schema: {err}')
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
+    return schema, _intern_keys(template)
+
+
+def _intern_keys(obj):
+    """Rebuild a tree of dicts and lists with all dict keys interned.
+
+    Copies of the template made by ``_fast_clone`` share these keys, so
+    every MCF uses the same key objects and lookups by those keys can
+    compare by identity.
+
+    Args:
+        obj: a dict, list, or other value
+
+    Returns:
+        ``obj`` with the keys of every nested dict interned
+
+    """
+    t = type(obj)
+    if t is dict:
+        return {sys.intern(k) if type(k) is str else k: _intern_keys(v)
+                for k, v in obj.items()}
+    if t is list:
+        return [_intern_keys(v) for v in obj]
+    return obj
+
+
+def _fast_clone(obj):
+    """Copy a tree of dicts and lists, like ``copy.deepcopy`` but faster.
+
+    Only dicts and lists are copied. All other values are assumed to be
+    immutable (e.g. str, int, float, bool, None) and are shared.
+
+    Args:
+        obj: a dict, list, or immutable value
+
+    Returns:
+        a copy of ``obj``
+
+    """
+    t = type(obj)
+    if t is dict:
+        return {k: _fast_clone(v) for k, v in obj.items()}
+    if t is list:
+        return [_fast_clone(v) for v in obj]
+    return obj
+
+
+def _get_mcf_template():
+    """Get a template MCF, building it the first time it is needed."""
+    return _get_mcf_schema_and_template()[1]
+
+
+# Strings that can be written as plain (unquoted) YAML scalars and still be
+# read back as the same string. Anything else is double-quoted.
+_YAML_PLAIN_STRING = re.compile(
+    r'[A-Za-z](?:[A-Za-z0-9_ .,/()@+-]*[A-Za-z0-9_.,/()@+-])?')
+# plain strings that YAML would read as booleans or null
+_YAML_KEYWORDS = {'y', 'n', 'yes', 'no', 'true', 'false', 'on', 'off', 'null'}
+# characters to escape in double-quoted strings, so the yaml is ASCII
+_YAML_ESCAPE_CHARS = re.compile('[\x7f-\U0010ffff]')
+# YAML readers only accept implicit keys up to this many characters long
+_YAML_MAX_KEY_LENGTH = 1024
+
+
+def _escape_yaml_char(match):
+    code = ord(match.group())
+    return f'\\u{code:04x}' if code <= 0xffff else f'\\U{code:08x}'
+
+
+def _yaml_scalar(value):
+    """Format a scalar as YAML.
+
+    Args:
+        value: a str, int, float, bool, date, datetime or None
+
+    Returns:
+        string YAML representation of ``value``
+
+    Raises:
+        TypeError if ``value`` is not one of the supported types.
+
+    """
+    if value is None:
+        return 'null'
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    t = type(value)
+    if t is str:
+        if not value:
+            return "''"
+        if (_YAML_PLAIN_STRING.fullmatch(value)
+                and value.lower() not in _YAML_KEYWORDS):
+            return value
+        # a JSON string is also a valid YAML double-quoted scalar
+        return _YAML_ESCAPE_CHARS.sub(
+            _escape_yaml_char, json.dumps(value, ensure_ascii=False))
+    if t is int:
+        return str(value)
+    if t is float:
+        if value != value:
+            return '.nan'
+        if value in (float('inf'), float('-inf')):
+            return '.inf' if value > 0 else '-.inf'
+        text = repr(value)
+        if 'e' in text and '.' not in text:
+            # YAML only reads exponents as floats if there is a '.'
+            text = text.replace('e', '.0e')
+        return text
+    if t is date or t is datetime:
+        return value.isoformat()
+    raise TypeError(f'cannot represent {t} as YAML')
+
+
+def _yaml_key(key):
+    """Format a dict key as YAML.
+
+    Args:
+        key: a str, int, float, bool, date, datetime or None
+
+    Returns:
+        string YAML representation of ``key``
+
+    Raises:
+        TypeError if ``key`` is not one of the supported types, or if it
+        is too long to write as an implicit key.
+
+    """
+    text = _yaml_scalar(key)
+    if len(text) > _YAML_MAX_KEY_LENGTH:
+        raise TypeError(
+            f'cannot represent a key longer than {_YAML_MAX_KEY_LENGTH} '
+            'characters as an implicit YAML key')
+    return text
+
+
+def _emit_yaml(obj, lines, indent):
+    """Append block-style YAML lines for a non-empty dict or list.
+
+    Args:
+        obj (dict or list): the collection to emit
+        lines (list): the list to append lines of YAML to
+        indent (string): whitespace to put before each line
+
+    Returns:
+        None
+
+    """
+    if type(obj) is dict:
+        for key in sorted(obj):
+            value = obj[key]
+            value_type = type(value)
+            if value_type is dict and value:
+                lines.append(f'{indent}{_yaml_key(key)}:\n')
+                _emit_yaml(value, lines, indent + '  ')
+            elif value_type is list and value:
+                # like pyyaml, do not indent a list under its key
+                lines.append(f'{indent}{_yaml_key(key)}:\n')
+                _emit_yaml(value, lines, indent)
             else:
-                template[prop] = _get_template(sch)
-        return template
-
-    elif 'type' in schema and schema['type'] == 'array':
-        if 'properties' in schema:
-            # for the weird case where identification.extents.spatial
-            # is type: array but contains 'properties' instead of 'items'
-            return [{
-                p: _get_template(s)
-                for p, s in schema['properties'].items()
-                if p in schema['required']
-            }]
-        return [_get_template(schema['items'])]
+                lines.append(
+                    f'{indent}{_yaml_key(key)}: {_yaml_value(value)}\n')
     else:
-        return _get_default(schema)
+        for item in obj:
+            if type(item) in (dict, list) and item:
+                # emit the item one level deeper, then put the
+                # '- ' marker in front of its first line
+                start = len(lines)
+                _emit_yaml(item, lines, indent + '  ')
+                lines[start] = f'{indent}- {lines[start][len(indent) + 2:]}'
+            else:
+                lines.append(f'{indent}- {_yaml_value(item)}\n')
+
+
+def _yaml_value(value):
+    """Format an empty collection or a scalar as YAML."""
+    if type(value) is dict:
+        return '{}'
+    if type(value) is list:
+        return '[]'
+    return _yaml_scalar(value)
+
+
+def _dump_yaml(obj):
+    """Serialize a dict as block-style YAML, with sorted keys and no aliases.
+
+    This handles only the simple types found in an MCF, which makes it
+    much faster than ``yaml.dump``.
+
+    Args:
+        obj (dict): a tree of dicts and lists of scalar values
+
+    Returns:
+        string of YAML that ``yaml.safe_load`` reads back as ``obj``
+
+    Raises:
+        TypeError if ``obj`` contains a value of an unsupported type, or
+        a key longer than ``_YAML_MAX_KEY_LENGTH`` characters.
+
+    """
+    if not obj:
+        return '{}\n'
+    lines = []
+    _emit_yaml(obj, lines, '')
+    return ''.join(lines)
 
 
 class MetadataControl(object):
@@ -174,7 +690,11 @@ class MetadataControl(object):
 
     """
 
-    def __init__(self, source_dataset_path=None):
+    __slots__ = (
+        'datasource', 'mcf', 'mcf_path', '_validate_on_set', '_dirty',
+        '_last_write', '_attr_index')
+
+    def __init__(self, source_dataset_path=None, validate_on_set=False):
         """Create an MCF instance, populated with properties of the dataset.
 
         The MCF will be valid according to the pygeometa schema. It has
@@ -187,9 +707,16 @@ class MetadataControl(object):
         Args:
             source_dataset_path (string): path to dataset to which the metadata
                 applies
+            validate_on_set (bool): if True, validate the MCF each time a
+                ``set_*`` method modifies it. If False (the default), the MCF
+                is validated once, when ``write`` is called, so a
+                ValidationError is raised there rather than by the setter.
 
         """
         self.mcf = None
+        self._validate_on_set = validate_on_set
+        self._dirty = False
+        self._last_write = None
         if source_dataset_path is not None:
             self.datasource = source_dataset_path
             self.mcf_path = f'{self.datasource}.yml'
@@ -207,7 +734,7 @@ class MetadataControl(object):
                     self.mcf = None
 
             if self.mcf is None:
-                self.mcf = _get_template(MCF_SCHEMA)
+                self.mcf = _fast_clone(_get_mcf_template())
                 self.mcf['metadata']['identifier'] = str(uuid.uuid4())
 
                 # fill all values that can be derived from the dataset
@@ -216,10 +743,12 @@ class MetadataControl(object):
                     ).strftime('%Y-%m-%d')
 
         else:
-            self.mcf = _get_template(MCF_SCHEMA)
+            self.mcf = _fast_clone(_get_mcf_template())
         self.mcf['mcf']['version'] = \
-            MCF_SCHEMA['properties']['mcf'][
+            _get_mcf_schema()['properties']['mcf'][
                 'properties']['version']['const']
+        # built the first time set_field_description needs it
+        self._attr_index = None
 
     def set_title(self, title):
         """Add a title for the dataset.
@@ -266,10 +795,7 @@ class MetadataControl(object):
         if kwargs:
             for k, v in kwargs.items():
                 self.mcf['contact'][section][k] = v
-
-        # TODO: validate just the contact section instead?
-        # Not obvious how to do that using the complete schema.
-        self.validate()
+        self._set_dirty()
 
     def get_contact(self, section='default'):
         """Get metadata from a contact section.
@@ -291,7 +817,7 @@ class MetadataControl(object):
 
         """
         self.mcf['identification']['edition'] = edition
-        self.validate()
+        self._set_dirty()
 
     def get_edition(self):
         """Get the edition of the dataset.
@@ -319,9 +845,6 @@ class MetadataControl(object):
             vocabulary (dict): a dictionary with 'name' and 'url' (optional)
                 keys. Used to describe the source (thesaurus) of keywords
 
-        Raises:
-            ValidationError
-
         """
         section_dict = {
             'keywords': keywords,
@@ -331,7 +854,7 @@ class MetadataControl(object):
         if vocabulary:
             section_dict['vocabulary'] = vocabulary
         self.mcf['identification']['keywords'][section] = section_dict
-        self.validate()
+        self._set_dirty()
 
     def set_license(self, license_name=None, license_url=None):
         """Add a license for the dataset.
@@ -354,7 +877,7 @@ class MetadataControl(object):
         license_dict['url'] = license_url if license_url else ''
         self.mcf['identification']['license'] = license_dict
         self.mcf['identification']['accessconstraints'] = constraints
-        self.validate()
+        self._set_dirty()
 
     def get_license(self):
         """Get ``license`` for the dataset.
@@ -374,7 +897,7 @@ class MetadataControl(object):
 
         """
         self.mcf['dataquality']['lineage']['statement'] = statement
-        self.validate()
+        self._set_dirty()
 
     def get_lineage(self):
         """Get the lineage statement of the dataset.
@@ -397,7 +920,7 @@ class MetadataControl(object):
         # supports 2015. For now, we can add `purpose` in `identification`.
         # Later we can move it elsewhere if it becomes formally supported.
         self.mcf['identification']['purpose'] = purpose
-        self.validate()
+        self._set_dirty()
 
     def get_purpose(self):
         """Get ``purpose`` for the dataset.
@@ -423,6 +946,9 @@ class MetadataControl(object):
         attribute = self.mcf['content_info']['attributes'][idx]
         if name is not None:
             attribute['name'] = name
+            # renaming may change which attribute is first with a name,
+            # so rebuild the index the next time it is used
+            self._attr_index = None
         if title is not None:
             attribute['title'] = title
         if abstract is not None:
@@ -430,8 +956,6 @@ class MetadataControl(object):
         if units is not None:
             attribute['units'] = units
 
-        self.mcf['content_info']['attributes'][idx] = attribute
-
     def set_field_description(self, name, title=None, abstract=None,
                               units=None):
         """Define metadata for a tabular field.
@@ -442,14 +966,21 @@ class MetadataControl(object):
             abstract (str): description of the field
             units (str): unit of measurement for the field's values
         """
-        def get_attr(attribute_list):
-            for idx, attr in enumerate(attribute_list):
-                if attr['name'] == name:
-                    return idx, attr
-            raise ValueError(
-                f'{self.datasource} has no attribute named {name}')
-
-        idx, attribute = get_attr(self.mcf['content_info']['attributes'])
+        attributes = self.mcf['content_info']['attributes']
+        idx = None
+        if self._attr_index is not None:
+            idx = self._attr_index.get(name)
+        if (idx is None or idx >= len(attributes)
+                or attributes[idx]['name'] != name):
+            # the index is not built yet, or the attributes
+            # changed since it was built
+            self._build_attr_index()
+            attributes = self.mcf['content_info']['attributes']
+            idx = self._attr_index.get(name)
+            if idx is None:
+                raise ValueError(
+                    f'{self.datasource} has no attribute named {name}')
+        attribute = attributes[idx]
 
         if title is not None:
             attribute['title'] = title
@@ -458,11 +989,35 @@ class MetadataControl(object):
         if units is not None:
             attribute['units'] = units
 
-        self.mcf['content_info']['attributes'][idx] = attribute
+    def _build_attr_index(self):
+        """Map attribute names to their index in the attributes list.
 
-    def _write_mcf(self, target_path):
-        with open(target_path, 'w') as file:
-            file.write(yaml.dump(self.mcf, Dumper=_NoAliasDumper))
+        If names are repeated, the first attribute with the name is used.
+        """
+        self._attr_index = {}
+        for idx, attr in enumerate(
+                self.mcf['content_info'].get('attributes', [])):
+            self._attr_index.setdefault(attr['name'], idx)
+
+    def _set_dirty(self):
+        """Mark the MCF as modified, validating it now if requested."""
+        self._dirty = True
+        if self._validate_on_set:
+            self.validate()
+
+    def _get_yaml(self):
+        """Serialize the MCF as YAML."""
+        try:
+            return _dump_yaml(self.mcf)
+        except TypeError:
+            # the MCF has values that need the full yaml library
+            return yaml.dump(self.mcf, Dumper=_NoAliasDumper)
+
+    def _write_mcf(self, target_path, yaml_string=None):
+        if yaml_string is None:
+            yaml_string = self._get_yaml()
+        with open(target_path, 'w', buffering=_WRITE_BUFFER_SIZE) as file:
+            file.write(yaml_string)
 
     def write(self):
         """Write MCF and ISO-19139 XML to disk.
@@ -474,14 +1029,51 @@ class MetadataControl(object):
         - 'myraster.tif.yml'
         - 'myraster.tif.xml'
 
+        Nothing is written if the MCF has not changed since the last
+        call to ``write`` and neither file has been modified since then.
+
+        Raises:
+            ValidationError if the MCF was modified by a ``set_*`` method
+            and is no longer valid.
+
         """
-        self._write_mcf(self.mcf_path)
+        if self._dirty:
+            self.validate()
+        # The YAML is needed to write the MCF anyway, and it is much faster
+        # to make than the XML, so use it to check whether the MCF has
+        # changed since it was last written.
+        yaml_string = self._get_yaml()
+        sidecar_mtimes = self._get_sidecar_mtimes()
+        if (sidecar_mtimes is not None
+                and self._last_write == (yaml_string, sidecar_mtimes)):
+            return
+
+        self._write_mcf(self.mcf_path, yaml_string)
+        # imported here because it is slow to import and only used here
+        from pygeometa.schemas.iso19139 import ISO19139OutputSchema
+
         # TODO: allow user to override the iso schema choice
         # iso_schema = ISO19139_2OutputSchema() # additional req'd properties
         iso_schema = ISO19139OutputSchema()
         xml_string = iso_schema.write(self.mcf)
-        with open(f'{self.datasource}.xml', 'w') as xmlfile:
+        with open(f'{self.datasource}.xml', 'w',
+                  buffering=_WRITE_BUFFER_SIZE) as xmlfile:
             xmlfile.write(xml_string)
+        self._last_write = (yaml_string, self._get_sidecar_mtimes())
+
+    def _get_sidecar_mtimes(self):
+        """Get the modified times of the '.yml' and '.xml' sidecar files.
+
+        Returns:
+            tuple of the two modified times, in nanoseconds, or ``None``
+            if either file does not exist.
+
+        """
+        try:
+            return (os.stat(self.mcf_path).st_mtime_ns,
+                    os.stat(f'{self.datasource}.xml').st_mtime_ns)
+        except FileNotFoundError:
+            return None
 
     def validate(self):
         """Validate MCF against a jsonschema object."""
@@ -489,94 +1081,150 @@ class MetadataControl(object):
         # be a superset of the core MCF schema.
         # If we wanted to validate against core MCF,
         # we could use pygeometa.core.validate_mcf
-        jsonschema.validate(self.mcf, MCF_SCHEMA)
+        try:
+            _get_mcf_validator()(self.mcf)
+        except fastjsonschema.JsonSchemaException as err:
+            # raise the same exception type that jsonschema would
+            raise ValidationError(err.message)
+        self._dirty = False
 
     def to_string(self):
         pass
 
     def _set_spatial_info(self):
         """Populate the MCF using properties of the dataset."""
-        try:
-            gis_type = pygeoprocessing.get_gis_type(self.datasource)
-        except ValueError:
+        gis_type = _get_gis_type(self.datasource)
+        if gis_type is None:
             self.mcf['metadata']['hierarchylevel'] = 'nonGeographicDataset'
             return
 
-        if gis_type == pygeoprocessing.VECTOR_TYPE:
-            self.mcf['metadata']['hierarchylevel'] = 'dataset'
-            self.mcf['spatial']['datatype'] = 'vector'
-            self.mcf['content_info']['type'] = 'coverage'
-
-            vector = gdal.OpenEx(self.datasource, gdal.OF_VECTOR)
-            layer = vector.GetLayer()
-            layer_defn = layer.GetLayerDefn()
-            geomname = ogr.GeometryTypeToName(layer_defn.GetGeomType())
-            geomtype = ''
-            # https://www.fgdc.gov/nap/metadata/register/codelists.html
-            if 'Point' in geomname:
-                geomtype = 'point'
-            if 'Polygon' in geomname:
-                geomtype = 'surface'
-            if 'Line' in geomname:
-                geomtype = 'curve'
-            if 'Collection' in geomname:
-                geomtype = 'complex'
-            self.mcf['spatial']['geomtype'] = geomtype
-
-            attributes = []
-            for field in layer.schema:
-                attribute = {}
-                attribute['name'] = field.name
-                try:
-                    attribute['type'] = OGR_MCF_ATTR_TYPE_MAP[field.type]
-                except KeyError:
-                    LOGGER.warning(
-                        f'{field.type} is missing in the OGR-to-MCF '
-                        f'attribute type map; attribute type for field '
-                        f'{field.name} will be "object".')
-                attribute['units'] = ''
-                attribute['title'] = ''
-                attribute['abstract'] = ''
-                attributes.append(attribute)
-            if len(attributes):
-                self.mcf['content_info']['attributes'] = attributes
-            vector = None
-            layer = None
-
-            gis_info = pygeoprocessing.get_vector_info(self.datasource)
-
-        if gis_type == pygeoprocessing.RASTER_TYPE:
-            self.mcf['metadata']['hierarchylevel'] = 'dataset'
-            self.mcf['spatial']['datatype'] = 'grid'
-            self.mcf['spatial']['geomtype'] = 'surface'
-            self.mcf['content_info']['type'] = 'image'
-
-            raster = gdal.OpenEx(self.datasource, gdal.OF_RASTER)
-            attributes = []
-            for i in range(raster.RasterCount):
-                b = i + 1
-                band = raster.GetRasterBand(b)
-                attribute = {}
-                attribute['name'] = ''
-                attribute['type'] = 'integer' if band.DataType < 6 else 'number'
-                attribute['units'] = ''
-                attribute['title'] = ''
-                attribute['abstract'] = band.GetDescription()
-                attributes.append(attribute)
-            if len(attributes):
-                self.mcf['content_info']['attributes'] = attributes
-            raster = None
-
-            gis_info = pygeoprocessing.get_raster_info(self.datasource)
-
-        srs = osr.SpatialReference()
-        srs.ImportFromWkt(gis_info['projection_wkt'])
-        epsg = srs.GetAttrValue('AUTHORITY', 1)
-        # for human-readable values after yaml dump, use python types
-        # instead of numpy types
-        bbox = [float(x) for x in gis_info['bounding_box']]
+        # A dataset may contain both vector layers and raster bands,
+        # e.g. a GeoPackage. Describe its vector layer in that case.
+        if gis_type & _VECTOR_TYPE:
+            open_flag, set_info = gdal.OF_VECTOR, self._set_vector_info
+        else:
+            open_flag, set_info = gdal.OF_RASTER, self._set_raster_info
+
+        dataset = gdal.OpenEx(self.datasource, open_flag)
+        if dataset is None:
+            # the file extension suggested a GIS type, but it is not one
+            self.mcf['metadata']['hierarchylevel'] = 'nonGeographicDataset'
+            return
+        self.mcf['metadata']['hierarchylevel'] = 'dataset'
+        projection_wkt, bounding_box = set_info(dataset)
+        dataset = None
+
+        epsg = _wkt_to_epsg(projection_wkt)
+        # the bounding box comes straight from GDAL, so it is already
+        # python floats that the yaml dumper can represent
         spatial_info = [{
-            'bbox': bbox,
+            'bbox': bounding_box,
             'crs': epsg  # MCF does not support WKT here
         }]
         self.mcf['identification']['extents']['spatial'] = spatial_info
+
+    def _set_vector_info(self, vector):
+        """Populate the MCF using properties of an open vector.
+
+        Args:
+            vector (gdal.Dataset): the open vector dataset
+
+        Returns:
+            A tuple of the vector's projection WKT and its bounding box
+            as ``[minx, miny, maxx, maxy]``.
+
+        """
+        spatial = self.mcf['spatial']
+        content_info = self.mcf['content_info']
+        spatial['datatype'] = 'vector'
+        content_info['type'] = 'coverage'
+
+        layer = vector.GetLayer()
+        layer_defn = layer.GetLayerDefn()
+        geomname = ogr.GeometryTypeToName(layer_defn.GetGeomType())
+        geomtype = ''
+        for name, mcf_geomtype in _OGR_MCF_GEOM_TYPES:
+            if name in geomname:
+                geomtype = mcf_geomtype
+                break
+        spatial['geomtype'] = geomtype
+
+        attributes = [_get_field_attribute(field) for field in layer.schema]
+        if len(attributes):
+            content_info['attributes'] = attributes
+
+        # get the extent and projection from the open layer rather
+        # than opening the vector again
+        spatial_ref = layer.GetSpatialRef()
+        projection_wkt = spatial_ref.ExportToWkt() if spatial_ref else None
+        # convert from [minx, maxx, miny, maxy] to [minx, miny, maxx, maxy]
+        extent = layer.GetExtent()
+        bounding_box = [extent[i] for i in [0, 2, 1, 3]]
+        layer = None
+        return projection_wkt, bounding_box
+
+    def _set_raster_info(self, raster):
+        """Populate the MCF using properties of an open raster.
+
+        Args:
+            raster (gdal.Dataset): the open raster dataset
+
+        Returns:
+            A tuple of the raster's projection WKT and its bounding box
+            as ``[minx, miny, maxx, maxy]``.
+
+        """
+        spatial = self.mcf['spatial']
+        content_info = self.mcf['content_info']
+        spatial['datatype'] = 'grid'
+        spatial['geomtype'] = 'surface'
+        content_info['type'] = 'image'
+
+        # read everything needed from the bands up front, so that
+        # building the attributes makes no calls into GDAL
+        bands = [raster.GetRasterBand(b + 1) for b in range(raster.RasterCount)]
+        band_types = [band.DataType for band in bands]
+        band_descriptions = [band.GetDescription() for band in bands]
+        bands = None
+
+        attributes = [
+            dict(_ATTR_PROTO,
+                 name='',
+                 type=GDAL_MCF_ATTR_TYPE_MAP.get(band_type, 'number'),
+                 abstract=description)
+            for band_type, description in zip(band_types, band_descriptions)
+        ]
+        if len(attributes):
+            content_info['attributes'] = attributes
+
+        # get the extent and projection from the open raster rather
+        # than opening it again
+        projection_wkt = raster.GetProjection()
+        gt = raster.GetGeoTransform()
+        x_bounds = [
+            gt[0],
+            gt[0] + raster.RasterXSize * gt[1] + raster.RasterYSize * gt[2]]
+        y_bounds = [
+            gt[3],
+            gt[3] + raster.RasterXSize * gt[4] + raster.RasterYSize * gt[5]]
+        bounding_box = [
+            min(x_bounds), min(y_bounds), max(x_bounds), max(y_bounds)]
+        return projection_wkt, bounding_box
+
+
+def describe_many(paths, max_workers=8):
+    """Create a MetadataControl for each of many datasets, in parallel.
+
+    GDAL releases the GIL while it reads files, so the datasets are
+    described in a pool of threads.
+
+    Args:
+        paths (list): paths to datasets to which the metadata applies
+        max_workers (int): the maximum number of threads to use
+
+    Returns:
+        list of MetadataControl, in the same order as ``paths``
+
+    """
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        return list(executor.map(MetadataControl, paths))
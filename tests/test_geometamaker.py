@@ -1,7 +1,9 @@
+import functools
 import os
 import shutil
 import tempfile
 import unittest
+from unittest import mock
 
 from jsonschema.exceptions import SchemaError
 from jsonschema.exceptions import ValidationError
@@ -33,6 +35,16 @@ _OGR_TYPES_VALUES_MAP = {
 }
 
 
+def _srs_for(epsg):
+    projection = osr.SpatialReference()
+    projection.ImportFromEPSG(epsg)
+    return projection.ExportToWkt()
+
+
+_EPSG_3116_WKT = _srs_for(3116)
+_EPSG_4326_WKT = _srs_for(4326)
+
+
 def create_vector(target_filepath, field_map=None):
     attribute_list = None
     if field_map:
@@ -40,21 +52,24 @@ def create_vector(target_filepath, field_map=None):
             k: _OGR_TYPES_VALUES_MAP[v]
             for k, v in field_map.items()
         }]
-    projection = osr.SpatialReference()
-    projection.ImportFromEPSG(3116)
     pygeoprocessing.shapely_geometry_to_vector(
         [shapely.geometry.Point(1, -1)],
         target_filepath,
-        projection.ExportToWkt(),
+        _EPSG_3116_WKT,
         'GEOJSON',
         fields=field_map,
         attribute_list=attribute_list,
         ogr_geom_type=ogr.wkbPoint)
 
 
+@functools.lru_cache(maxsize=None)
+def _const_tile(dtype_char):
+    return numpy.ones((2, 2), dtype=numpy.dtype(dtype_char))
+
+
 def create_raster(
         numpy_dtype, target_path,
-        pixel_size=(1, 1), projection_epsg=4326,
+        pixel_size=(1, 1), projection_wkt=_EPSG_4326_WKT,
         origin=(0, 0)):
     driver_name, creation_options = DEFAULT_GTIFF_CREATION_TUPLE_OPTIONS
     raster_driver = gdal.GetDriverByName(driver_name)
@@ -66,15 +81,10 @@ def create_raster(
     new_raster.SetGeoTransform(
         [origin[0], pixel_size[0], 0, origin[1], 0, pixel_size[1]])
 
-    projection = osr.SpatialReference()
-    projection_wkt = None
-    if projection_epsg is not None:
-        projection.ImportFromEPSG(projection_epsg)
-        projection_wkt = projection.ExportToWkt()
     if projection_wkt is not None:
         new_raster.SetProjection(projection_wkt)
 
-    base_array = numpy.full((2, 2), 1, dtype=numpy_dtype)
+    base_array = _const_tile(numpy.dtype(numpy_dtype).char)
     target_nodata = pygeoprocessing.choose_nodata(numpy_dtype)
 
     band_1 = new_raster.GetRasterBand(1)
@@ -88,16 +98,48 @@ def create_raster(
     new_raster = None
 
 
+def create_empty_raster(target_path, projection_wkt=_EPSG_4326_WKT):
+    """Create a single-band Byte raster without writing any pixels.
+
+    For tests that only exercise metadata and never read pixel values.
+    """
+    driver_name, creation_options = DEFAULT_GTIFF_CREATION_TUPLE_OPTIONS
+    raster_driver = gdal.GetDriverByName(driver_name)
+    new_raster = raster_driver.Create(target_path, 2, 2, 1, gdal.GDT_Byte)
+    new_raster.SetGeoTransform([0, 1, 0, 0, 0, 1])
+    new_raster.SetProjection(projection_wkt)
+    new_raster = None
+
+
 class MetadataControlTests(unittest.TestCase):
     """Tests for geometamaker."""
 
-    def setUp(self):
-        """Override setUp function to create temp workspace directory."""
-        self.workspace_dir = tempfile.mkdtemp()
+    @classmethod
+    def setUpClass(cls):
+        """Create one temp directory shared by all tests in the class."""
+        from geometamaker import geometamaker
+
+        cls._root = tempfile.mkdtemp()
+        # keep the MCF schema cache out of the user's real cache directory
+        cls._cache_patcher = mock.patch.dict(
+            os.environ, {'XDG_CACHE_HOME': cls._root})
+        cls._cache_patcher.start()
+        geometamaker._get_mcf_schema_and_template.cache_clear()
 
-    def tearDown(self):
-        """Override tearDown function to remove temporary directory."""
-        shutil.rmtree(self.workspace_dir)
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the shared temp directory."""
+        from geometamaker import geometamaker
+
+        cls._cache_patcher.stop()
+        geometamaker._get_mcf_schema_and_template.cache_clear()
+        shutil.rmtree(cls._root)
+
+    def setUp(self):
+        """Override setUp function to create a per-test workspace directory."""
+        self.workspace_dir = os.path.join(
+            self._root, self.id().rsplit('.', 1)[-1])
+        os.mkdir(self.workspace_dir)
 
     def test_blank_MetadataControl(self):
         """MetadataControl: template has expected properties."""
@@ -116,6 +158,65 @@ class MetadataControlTests(unittest.TestCase):
 
         self.assertEqual(actual, expected)
 
+    def test_mcf_schema_cache(self):
+        """MetadataControl: schema and template are cached on disk."""
+        from geometamaker import geometamaker
+
+        with mock.patch.dict(
+                os.environ, {'XDG_CACHE_HOME': self.workspace_dir}):
+            geometamaker._get_mcf_schema_and_template.cache_clear()
+            try:
+                schema, template = \
+                    geometamaker._get_mcf_schema_and_template()
+                self.assertTrue(
+                    os.path.exists(geometamaker._get_cache_path()))
+
+                # load again, from the cache this time
+                geometamaker._get_mcf_schema_and_template.cache_clear()
+                cached_schema, cached_template = \
+                    geometamaker._get_mcf_schema_and_template()
+            finally:
+                geometamaker._get_mcf_schema_and_template.cache_clear()
+
+        self.assertEqual(cached_schema, schema)
+        self.assertEqual(cached_template, template)
+
+    def test_write_mcf_round_trip(self):
+        """MetadataControl: written yaml loads back as the same MCF."""
+        from geometamaker import MetadataControl
+
+        target_filepath = os.path.join(self.workspace_dir, 'mcf.yml')
+
+        mc = MetadataControl()
+        mc.mcf['identification']['title'] = 'yes'
+        mc.mcf['identification']['abstract'] = 'line one\nline: two # \u00e9'
+        mc.mcf['identification']['keywords']['default']['keywords'] = [
+            '1.0', '2020-01-01', 'null', '- item', ' padded ', '']
+        mc.mcf['content_info']['dimensions'] = [
+            {'name': 'a', 'min': -1e-07, 'max': 1e20, 'units': 'm'}]
+        mc.mcf['identification']['extents']['spatial'] = [
+            {'bbox': [-180.0, -90.0, 180.0, 90.0], 'crs': 4326}]
+        mc._write_mcf(target_filepath)
+
+        with open(target_filepath, 'r') as file:
+            actual = yaml.safe_load(file)
+        self.assertEqual(actual, mc.mcf)
+
+    def test_write_mcf_long_key(self):
+        """MetadataControl: written yaml loads back with very long keys."""
+        from geometamaker import MetadataControl
+
+        target_filepath = os.path.join(self.workspace_dir, 'mcf.yml')
+
+        mc = MetadataControl()
+        mc.mcf['identification']['keywords']['k' * 2000] = {
+            'keywords': ['a'], 'keywords_type': 'theme'}
+        mc._write_mcf(target_filepath)
+
+        with open(target_filepath, 'r') as file:
+            actual = yaml.safe_load(file)
+        self.assertEqual(actual, mc.mcf)
+
     def test_vector_MetadataControl(self):
         """MetadataControl: validate basic vector MetadataControl."""
         from geometamaker import MetadataControl
@@ -167,6 +268,95 @@ class MetadataControlTests(unittest.TestCase):
                 f'{e}')
         mc.write()
 
+    def test_mislabeled_raster_MetadataControl(self):
+        """MetadataControl: a non-raster file with a raster extension."""
+        from geometamaker import MetadataControl
+
+        datasource_path = os.path.join(self.workspace_dir, 'raster.tif')
+        with open(datasource_path, 'w') as file:
+            file.write('not a raster')
+
+        mc = MetadataControl(datasource_path)
+        self.assertEqual(
+            mc.mcf['metadata']['hierarchylevel'], 'nonGeographicDataset')
+
+    def test_gis_type_from_file_signature(self):
+        """MetadataControl: detect GIS type from a file's first bytes."""
+        from geometamaker import geometamaker
+
+        raster_path = os.path.join(self.workspace_dir, 'raster.tif')
+        create_raster(numpy.int16, raster_path)
+        unlisted_raster_path = os.path.join(self.workspace_dir, 'raster.dat')
+        shutil.copyfile(raster_path, unlisted_raster_path)
+
+        shapefile_path = os.path.join(self.workspace_dir, 'vector.dat')
+        with open(shapefile_path, 'wb') as file:
+            file.write(b'\x00\x00\x27\x0a' + b'\x00' * 96)
+
+        with mock.patch.object(geometamaker.gdal, 'OpenEx') as mock_open:
+            self.assertEqual(
+                geometamaker._get_gis_type(unlisted_raster_path),
+                geometamaker._RASTER_TYPE)
+            self.assertEqual(
+                geometamaker._get_gis_type(shapefile_path),
+                geometamaker._VECTOR_TYPE)
+            mock_open.assert_not_called()
+
+        from geometamaker import MetadataControl
+        mc = MetadataControl(unlisted_raster_path)
+        self.assertEqual(mc.mcf['metadata']['hierarchylevel'], 'dataset')
+        self.assertEqual(mc.mcf['spatial']['datatype'], 'grid')
+
+    def test_gis_type_unknown_signature(self):
+        """MetadataControl: ask GDAL for files with an unknown signature."""
+        from geometamaker import geometamaker
+
+        vector_path = os.path.join(self.workspace_dir, 'vector.geojson')
+        create_vector(vector_path, None)
+        unlisted_vector_path = os.path.join(self.workspace_dir, 'vector.json')
+        shutil.copyfile(vector_path, unlisted_vector_path)
+
+        with mock.patch.object(
+                geometamaker.gdal, 'OpenEx',
+                wraps=geometamaker.gdal.OpenEx) as mock_open:
+            self.assertEqual(
+                geometamaker._get_gis_type(unlisted_vector_path),
+                geometamaker._VECTOR_TYPE)
+            mock_open.assert_called_once()
+
+    def test_gis_type_of_replaced_file(self):
+        """MetadataControl: detect the GIS type again if a file changes."""
+        from geometamaker import geometamaker
+
+        datasource_path = os.path.join(self.workspace_dir, 'dataset')
+        with open(datasource_path, 'w') as file:
+            file.write('not a dataset')
+        self.assertIsNone(geometamaker._get_gis_type(datasource_path))
+
+        raster_path = os.path.join(self.workspace_dir, 'raster.tif')
+        create_raster(numpy.int16, raster_path)
+        shutil.copyfile(raster_path, datasource_path)
+        self.assertEqual(
+            geometamaker._get_gis_type(datasource_path),
+            geometamaker._RASTER_TYPE)
+
+    def test_describe_many(self):
+        """MetadataControl: describe a list of datasets."""
+        from geometamaker import describe_many
+
+        raster_path = os.path.join(self.workspace_dir, 'raster.tif')
+        create_raster(numpy.int16, raster_path)
+        vector_path = os.path.join(self.workspace_dir, 'vector.geojson')
+        create_vector(vector_path, None)
+
+        mc_list = describe_many([raster_path, vector_path], max_workers=2)
+        self.assertEqual(
+            [mc.datasource for mc in mc_list], [raster_path, vector_path])
+        self.assertEqual(mc_list[0].mcf['spatial']['datatype'], 'grid')
+        self.assertEqual(mc_list[1].mcf['spatial']['datatype'], 'vector')
+        for mc in mc_list:
+            mc.validate()
+
     def test_vector_attributes(self):
         """MetadataControl: validate vector with extra attribute metadata."""
         from geometamaker import MetadataControl
@@ -205,6 +395,19 @@ class MetadataControlTests(unittest.TestCase):
         self.assertEqual(attr['abstract'], abstract)
         self.assertEqual(attr['units'], units)
 
+    def test_vector_attributes_missing_field(self):
+        """MetadataControl: describing a nonexistent field raises ValueError."""
+        from geometamaker import MetadataControl
+
+        datasource_path = os.path.join(self.workspace_dir, 'vector.geojson')
+        field_map = {
+            'foo': list(_OGR_TYPES_VALUES_MAP)[0]}
+        create_vector(datasource_path, field_map)
+
+        mc = MetadataControl(datasource_path)
+        with self.assertRaises(ValueError):
+            mc.set_field_description('bar', title='title')
+
     def test_raster_attributes(self):
         """MetadataControl: validate raster with extra attribute metadata."""
         from geometamaker import MetadataControl
@@ -243,6 +446,56 @@ class MetadataControlTests(unittest.TestCase):
         self.assertEqual(attr['abstract'], abstract)
         self.assertEqual(attr['units'], units)
 
+    def test_raster_attribute_types(self):
+        """MetadataControl: raster band types map to MCF attribute types."""
+        from geometamaker import MetadataControl
+
+        for numpy_dtype, expected_type in [
+                (numpy.uint8, 'integer'),
+                (numpy.int32, 'integer'),
+                (numpy.float32, 'number'),
+                (numpy.float64, 'number')]:
+            datasource_path = os.path.join(
+                self.workspace_dir, f'{numpy.dtype(numpy_dtype).name}.tif')
+            create_raster(numpy_dtype, datasource_path)
+            mc = MetadataControl(datasource_path)
+            for attr in mc.mcf['content_info']['attributes']:
+                self.assertEqual(attr['type'], expected_type)
+
+    @unittest.skipUnless(
+        hasattr(gdal, 'GDT_Int64'), 'GDAL has no 64-bit integer types')
+    def test_raster_attribute_64bit_integer_types(self):
+        """MetadataControl: newer GDAL integer types are 'integer'."""
+        from geometamaker import MetadataControl
+
+        numpy_dtypes = [numpy.uint64, numpy.int64]
+        if hasattr(gdal, 'GDT_Int8'):
+            numpy_dtypes.append(numpy.int8)
+        for numpy_dtype in numpy_dtypes:
+            datasource_path = os.path.join(
+                self.workspace_dir, f'{numpy.dtype(numpy_dtype).name}.tif')
+            create_raster(numpy_dtype, datasource_path)
+            mc = MetadataControl(datasource_path)
+            for attr in mc.mcf['content_info']['attributes']:
+                self.assertEqual(attr['type'], 'integer')
+
+    def test_field_description_repeated_name(self):
+        """MetadataControl: a repeated attribute name refers to the first."""
+        from geometamaker import MetadataControl
+
+        datasource_path = os.path.join(self.workspace_dir, 'raster.tif')
+        create_raster(numpy.int16, datasource_path)
+
+        mc = MetadataControl(datasource_path)
+        mc.set_band_description(2, name='a')
+        mc.set_field_description('a', title='B')
+        mc.set_band_description(1, name='a')
+        mc.set_field_description('a', title='T')
+
+        attributes = mc.mcf['content_info']['attributes']
+        self.assertEqual(attributes[0]['title'], 'T')
+        self.assertEqual(attributes[1]['title'], 'B')
+
     def test_set_contact(self):
         """MetadataControl: set and get a contact section."""
 
@@ -253,7 +506,7 @@ class MetadataControlTests(unittest.TestCase):
         position = 'boss'
         email = 'abc@def'
         datasource_path = os.path.join(self.workspace_dir, 'raster.tif')
-        create_raster(numpy.int16, datasource_path)
+        create_empty_raster(datasource_path)
         mc = MetadataControl(datasource_path)
         mc.set_contact(
             organization=org, individualname=name,
@@ -279,7 +532,7 @@ class MetadataControlTests(unittest.TestCase):
         }
 
         datasource_path = os.path.join(self.workspace_dir, 'raster.tif')
-        create_raster(numpy.int16, datasource_path)
+        create_empty_raster(datasource_path)
         mc = MetadataControl(datasource_path)
         mc.set_contact(**contact_dict)
         actual = mc.get_contact()
@@ -293,10 +546,22 @@ class MetadataControlTests(unittest.TestCase):
 
         postalcode = 55555  # should be a string
         datasource_path = os.path.join(self.workspace_dir, 'raster.tif')
-        create_raster(numpy.int16, datasource_path)
+        create_empty_raster(datasource_path)
         mc = MetadataControl(datasource_path)
+        mc.set_contact(postalcode=postalcode)
+        with self.assertRaises(ValidationError):
+            mc.write()
+
+    def test_validate_on_set(self):
+        """MetadataControl: setter raises ValidationError if validate_on_set."""
+
+        from geometamaker import MetadataControl
+
+        datasource_path = os.path.join(self.workspace_dir, 'raster.tif')
+        create_empty_raster(datasource_path)
+        mc = MetadataControl(datasource_path, validate_on_set=True)
         with self.assertRaises(ValidationError):
-            mc.set_contact(postalcode=postalcode)
+            mc.set_edition(3.14)  # should be a string
 
     def test_set_get_edition(self):
         """MetadataControl: set and get dataset edition."""
@@ -304,7 +569,7 @@ class MetadataControlTests(unittest.TestCase):
         from geometamaker import MetadataControl
 
         datasource_path = os.path.join(self.workspace_dir, 'raster.tif')
-        create_raster(numpy.int16, datasource_path)
+        create_empty_raster(datasource_path)
         mc = MetadataControl(datasource_path)
         version = '3.14'
         mc.set_edition(version)
@@ -316,11 +581,12 @@ class MetadataControlTests(unittest.TestCase):
         from geometamaker import MetadataControl
 
         datasource_path = os.path.join(self.workspace_dir, 'raster.tif')
-        create_raster(numpy.int16, datasource_path)
+        create_empty_raster(datasource_path)
         mc = MetadataControl(datasource_path)
         version = 3.14  # should be a string
+        mc.set_edition(version)
         with self.assertRaises(ValidationError):
-            mc.set_edition(version)
+            mc.write()
 
     def test_set_keywords(self):
         """MetadataControl: set keywords to default section."""
@@ -328,7 +594,7 @@ class MetadataControlTests(unittest.TestCase):
         from geometamaker import MetadataControl
 
         datasource_path = os.path.join(self.workspace_dir, 'raster.tif')
-        create_raster(numpy.int16, datasource_path)
+        create_empty_raster(datasource_path)
         mc = MetadataControl(datasource_path)
         mc.set_keywords(['foo', 'bar'])
 
@@ -342,7 +608,7 @@ class MetadataControlTests(unittest.TestCase):
         from geometamaker import MetadataControl
 
         datasource_path = os.path.join(self.workspace_dir, 'raster.tif')
-        create_raster(numpy.int16, datasource_path)
+        create_empty_raster(datasource_path)
         mc = MetadataControl(datasource_path)
         mc.set_keywords(['foo', 'bar'], section='first')
         mc.set_keywords(['baz'], section='second')
@@ -360,7 +626,7 @@ class MetadataControlTests(unittest.TestCase):
         from geometamaker import MetadataControl
 
         datasource_path = os.path.join(self.workspace_dir, 'raster.tif')
-        create_raster(numpy.int16, datasource_path)
+        create_empty_raster(datasource_path)
         mc = MetadataControl(datasource_path)
         mc.set_keywords(['foo', 'bar'])
         mc.set_keywords(['baz'])
@@ -374,17 +640,18 @@ class MetadataControlTests(unittest.TestCase):
         from geometamaker import MetadataControl
 
         datasource_path = os.path.join(self.workspace_dir, 'raster.tif')
-        create_raster(numpy.int16, datasource_path)
+        create_empty_raster(datasource_path)
         mc = MetadataControl(datasource_path)
+        mc.set_keywords('foo', 'bar')
         with self.assertRaises(ValidationError):
-            mc.set_keywords('foo', 'bar')
+            mc.write()
 
     def test_set_and_get_license(self):
         """MetadataControl: set purpose of dataset."""
         from geometamaker import MetadataControl
 
         datasource_path = os.path.join(self.workspace_dir, 'raster.tif')
-        create_raster(numpy.int16, datasource_path)
+        create_empty_raster(datasource_path)
         mc = MetadataControl(datasource_path)
         name = 'CC-BY-4.0'
         url = 'https://creativecommons.org/licenses/by/4.0/'
@@ -401,20 +668,22 @@ class MetadataControlTests(unittest.TestCase):
         from geometamaker import MetadataControl
 
         datasource_path = os.path.join(self.workspace_dir, 'raster.tif')
-        create_raster(numpy.int16, datasource_path)
+        create_empty_raster(datasource_path)
         mc = MetadataControl(datasource_path)
         name = 4.0  # should be a string
+        mc.set_license(license_name=name)
         with self.assertRaises(ValidationError):
-            mc.set_license(license_name=name)
+            mc.write()
+        mc.set_license(license_url=name)
         with self.assertRaises(ValidationError):
-            mc.set_license(license_url=name)
+            mc.write()
 
     def test_set_and_get_lineage(self):
         """MetadataControl: set lineage of dataset."""
         from geometamaker import MetadataControl
 
         datasource_path = os.path.join(self.workspace_dir, 'raster.tif')
-        create_raster(numpy.int16, datasource_path)
+        create_empty_raster(datasource_path)
         mc = MetadataControl(datasource_path)
         statement = 'a lineage statment'
 
@@ -427,18 +696,19 @@ class MetadataControlTests(unittest.TestCase):
         from geometamaker import MetadataControl
 
         datasource_path = os.path.join(self.workspace_dir, 'raster.tif')
-        create_raster(numpy.int16, datasource_path)
+        create_empty_raster(datasource_path)
         mc = MetadataControl(datasource_path)
         lineage = ['some statement']  # should be a string
+        mc.set_lineage(lineage)
         with self.assertRaises(ValidationError):
-            mc.set_lineage(lineage)
+            mc.write()
 
     def test_set_and_get_purpose(self):
         """MetadataControl: set purpose of dataset."""
         from geometamaker import MetadataControl
 
         datasource_path = os.path.join(self.workspace_dir, 'raster.tif')
-        create_raster(numpy.int16, datasource_path)
+        create_empty_raster(datasource_path)
         mc = MetadataControl(datasource_path)
         purpose = 'foo'
         mc.set_purpose(purpose)
@@ -451,7 +721,7 @@ class MetadataControlTests(unittest.TestCase):
         title = 'Title'
         keyword = 'foo'
         datasource_path = os.path.join(self.workspace_dir, 'raster.tif')
-        create_raster(numpy.int16, datasource_path)
+        create_empty_raster(datasource_path)
         mc = MetadataControl(datasource_path)
         mc.set_title(title)
         mc.write()
@@ -465,12 +735,74 @@ class MetadataControlTests(unittest.TestCase):
             new_mc.mcf['identification']['keywords']['default']['keywords'],
             [keyword])
 
+    def test_write_unchanged(self):
+        """MetadataControl: write does nothing if the MCF is unchanged."""
+        from geometamaker import MetadataControl
+
+        datasource_path = os.path.join(self.workspace_dir, 'raster.tif')
+        create_empty_raster(datasource_path)
+        mc = MetadataControl(datasource_path)
+        mc.set_title('Title')
+        mc.write()
+
+        with mock.patch.object(
+                MetadataControl, '_write_mcf') as mock_write_mcf:
+            mc.write()
+            mock_write_mcf.assert_not_called()
+
+            mc.set_title('New Title')
+            mc.write()
+            mock_write_mcf.assert_called_once()
+
+    def test_write_changed_value_type(self):
+        """MetadataControl: write detects a value replaced by another type."""
+        from datetime import date
+        from geometamaker import MetadataControl
+
+        datasource_path = os.path.join(self.workspace_dir, 'raster.tif')
+        create_empty_raster(datasource_path)
+        mc = MetadataControl(datasource_path)
+        mc.mcf['identification']['dates']['creation'] = '2020-01-01'
+        mc.write()
+
+        with mock.patch.object(
+                MetadataControl, '_write_mcf') as mock_write_mcf:
+            mc.mcf['identification']['dates']['creation'] = date(2020, 1, 1)
+            mc.write()
+            mock_write_mcf.assert_called_once()
+
+    def test_write_mixed_key_types(self):
+        """MetadataControl: write an MCF with keys of different types."""
+        from geometamaker import MetadataControl
+
+        datasource_path = os.path.join(self.workspace_dir, 'raster.tif')
+        create_empty_raster(datasource_path)
+        mc = MetadataControl(datasource_path)
+        mc.mcf['identification']['extra'] = {1: 'a', 'b': 'c'}
+        mc.write()
+
+        with open(mc.mcf_path, 'r') as file:
+            actual = yaml.safe_load(file)
+        self.assertEqual(actual['identification']['extra'], {1: 'a', 'b': 'c'})
+
+    def test_write_after_sidecar_removed(self):
+        """MetadataControl: write replaces a removed sidecar file."""
+        from geometamaker import MetadataControl
+
+        datasource_path = os.path.join(self.workspace_dir, 'raster.tif')
+        create_empty_raster(datasource_path)
+        mc = MetadataControl(datasource_path)
+        mc.write()
+        os.remove(mc.mcf_path)
+        mc.write()
+        self.assertTrue(os.path.exists(mc.mcf_path))
+
     def test_invalid_preexisting_mcf(self):
         """MetadataControl: test overwriting an existing invalid MetadataControl."""
         from geometamaker import MetadataControl
         title = 'Title'
         datasource_path = os.path.join(self.workspace_dir, 'raster.tif')
-        create_raster(numpy.int16, datasource_path)
+        create_empty_raster(datasource_path)
         mc = MetadataControl(datasource_path)
         mc.set_title(title)
 